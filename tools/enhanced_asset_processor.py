@@ -7,20 +7,57 @@ Advanced sprite detection and background removal for game assets
 import os
 import json
 import shutil
+import hashlib
 from pathlib import Path
-from PIL import Image, ImageOps, ImageFilter
+from PIL import Image
 import cv2
 import numpy as np
+import PIL
 import argparse
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from typing import List, Tuple, Dict, Optional
 
+try:
+    from numba import njit, prange, set_num_threads
+except ImportError:
+    njit = None
+
+try:
+    from diskcache_rs import Cache
+except ImportError:
+    Cache = None
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _color_key_alpha(rgba, tr, tg, tb, tol3):
+        """Zero the alpha of every pixel within tol3 (L1) of the key color"""
+        height, width = rgba.shape[0], rgba.shape[1]
+        for y in prange(height):
+            for x in range(width):
+                d = (abs(int(rgba[y, x, 0]) - tr) + abs(int(rgba[y, x, 1]) - tg)
+                     + abs(int(rgba[y, x, 2]) - tb))
+                if d <= tol3:
+                    rgba[y, x, 3] = 0
+else:
+    _color_key_alpha = None
+
 class EnhancedAssetProcessor:
-    def __init__(self, config_file: str = "asset_config.json"):
+    def __init__(self, config_file: str = "asset_config.json", config: Optional[Dict] = None,
+                 setup_directories: bool = True, force: bool = False):
         """Initialize the asset processor with configuration"""
-        self.config = self.load_config(config_file)
-        self.setup_directories()
-        self.asset_manifest = {"version": "1.0", "assets": {}, "sprite_size": self.config["sprite_size"], "format": self.config["output_format"]}
+        self.config = config if config is not None else self.load_config(config_file)
+        self.force = force
+        if setup_directories:
+            self.setup_directories()
+        # On-disk cache of detected sprite boxes, so unchanged sheets skip contour detection
+        self._cache = Cache(".asset_cache") if Cache is not None else None
+        self._rembg_session = None
+        # OpenCL isn't fork-safe, so only pool workers probe for it (see _init_worker)
+        self._use_opencl = False
+        self.asset_manifest = {"version": "1.0", "assets": {}, "sprite_size": self.config["sprite_size"], "format": self.config["output_format"],
+                               "config_hash": self.output_config_hash()}
+        self._previous_assets = self.load_previous_assets()
     
     def load_config(self, config_file: str) -> Dict:
         """Load configuration from JSON file"""
@@ -30,8 +67,26 @@ class EnhancedAssetProcessor:
         else:
             raise FileNotFoundError(f"Config file not found: {config_file}")
     
+    def load_previous_assets(self) -> Dict:
+        """Load the asset entries from the last run's manifest, if any and if it was
+        written with the same output-affecting config"""
+        manifest_path = os.path.join(self.config["output_dir"], "asset_manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get("config_hash") == self.output_config_hash():
+                return manifest.get("assets", {})
+        return {}
+    
+    def output_config_hash(self) -> str:
+        """Hash every config setting that changes what gets written for a sheet"""
+        key = json.dumps([self.config[k] for k in ("sprite_size", "output_format", "background_removal",
+                                                   "naming", "padding")]
+                         + [self.config.get("png_compress_level", 1)], sort_keys=True)
+        return hashlib.sha1(key.encode()).hexdigest()
+    
     def setup_directories(self):
-        """Create necessary directories and clean existing output"""
+        """Create necessary directories (cleaning existing output only when forced)"""
         Path(self.config["input_dir"]).mkdir(exist_ok=True)
         
         # Clean and recreate output directory
@@ -43,53 +98,75 @@ class EnhancedAssetProcessor:
         for subdir in ["characters", "items", "ui", "backgrounds"]:
             subdir_path = output_path / subdir
             if subdir_path.exists():
-                # Only clean characters directory
-                if subdir == "characters":
+                # Only clean characters directory, and only on a forced rebuild
+                if subdir == "characters" and self.force:
                     shutil.rmtree(subdir_path)
             subdir_path.mkdir(exist_ok=True)
     
-    def detect_sprites(self, image_path: str) -> List[Dict]:
+    def detect_sprites(self, image_path: str) -> Tuple[List[Dict], np.ndarray]:
         """
         Advanced sprite detection that finds actual sprite boundaries
         rather than just dividing by a grid
         """
         print(f"Processing image: {image_path}")
         
-        # Load image and convert to RGBA
-        image = Image.open(image_path)
-        if image.mode != 'RGBA':
-            image = image.convert('RGBA')
-        
-        # Convert to numpy array for OpenCV processing
-        img_array = np.array(image)
+        img_array, has_alpha, reduction = self.load_sheet(image_path)
+        img_h, img_w = img_array.shape[:2]
         
-        # Convert to grayscale for contour detection
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGBA2GRAY)
+        # Reuse the boxes from a previous run if the sheet and grid config are unchanged
+        cache_key = self.detection_cache_key(image_path)
+        bboxes = self._cache.get(cache_key) if self._cache is not None else None
         
-        # Apply some preprocessing to improve sprite detection
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        _, thresh = cv2.threshold(blurred, 240, 255, cv2.THRESH_BINARY_INV)
-        
-        # Find contours - these will be our sprite candidates
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Filter out very small contours (noise)
-        min_area = 100  # Adjust based on your sprite size
-        valid_contours = [cnt for cnt in contours if cv2.contourArea(cnt) > min_area]
-        
-        # Sort contours by position (top to bottom, left to right)
-        def contour_sort_key(contour):
-            x, y, w, h = cv2.boundingRect(contour)
-            # Sort primarily by row (y value) and secondarily by column (x value)
-            row_height = image.height // (self.config["grid_detection"]["manual_rows"] or 4)
-            row = y // row_height
-            return (row, x)
+        if bboxes is None:
+            # Run the preprocessing on the OpenCL device when one is available
+            src = cv2.UMat(img_array) if self._use_opencl else img_array
+            
+            # Convert to grayscale for contour detection
+            gray = cv2.cvtColor(src, cv2.COLOR_RGBA2GRAY)
+            
+            # Only coarse sprite boxes are needed, so detect on a half-size copy
+            scale = 2
+            small = cv2.pyrDown(gray)
+            
+            # Apply some preprocessing to improve sprite detection
+            blurred = cv2.GaussianBlur(small, (5, 5), 0)
+            _, thresh = cv2.threshold(blurred, 240, 255, cv2.THRESH_BINARY_INV)
+            if self._use_opencl:
+                thresh = thresh.get()
+            
+            # Connected components give every candidate's box and area in a single call
+            _, _, stats, _ = cv2.connectedComponentsWithStats(thresh, connectivity=8)
+            stats = stats[1:]  # Drop the background label
+            
+            # Filter out very small components (noise)
+            # (areas shrink with both the detection scale and any decode-time reduction)
+            min_area = 100 / (scale * reduction) ** 2  # Adjust based on your sprite size
+            stats = stats[stats[:, cv2.CC_STAT_AREA] > min_area]
             
-        valid_contours.sort(key=contour_sort_key)
+            # Boxes in full-size coordinates
+            boxes = stats[:, [cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP,
+                              cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT]] * scale
+            
+            # Sort by position: primarily by row (y value) and secondarily by column (x value)
+            row_height = img_h // (self.config["grid_detection"]["manual_rows"] or 4)
+            order = np.lexsort((boxes[:, 0], boxes[:, 1] // row_height))
+            bboxes = [tuple(int(v) for v in box) for box in boxes[order]]
+            
+            if self._cache is not None:
+                self._cache.set(cache_key, bboxes)
+        
+        # Key out the background once for the whole sheet instead of per sprite,
+        # unless the sheet already comes with a transparent background
+        if self.config["background_removal"]["method"] != "rembg":
+            if has_alpha and self.config["background_removal"].get("skip_if_has_alpha", True) \
+                    and self.has_transparent_background(img_array):
+                print("Sheet already has a transparent background, skipping color key")
+            else:
+                img_array = self.apply_color_key(img_array)
         
         # Detect grid dimensions based on contours
         if self.config["grid_detection"]["auto_detect"]:
-            rows, cols = self.detect_grid_from_contours(valid_contours, image.size)
+            rows, cols = self.detect_grid_from_contours(bboxes, (img_w, img_h))
         else:
             rows = self.config["grid_detection"]["manual_rows"]
             cols = self.config["grid_detection"]["manual_cols"]
@@ -101,17 +178,16 @@ class EnhancedAssetProcessor:
         
         # If we have the right number of contours, use them directly
         expected_sprites = rows * cols
-        if len(valid_contours) == expected_sprites:
-            print(f"Found exact number of sprites: {len(valid_contours)}")
-            for i, contour in enumerate(valid_contours):
-                x, y, w, h = cv2.boundingRect(contour)
-                
+        if len(bboxes) == expected_sprites:
+            print(f"Found exact number of sprites: {len(bboxes)}")
+            # Padding is configured in full-resolution sheet pixels
+            padding = round(self.config["padding"] / reduction)
+            for i, (x, y, w, h) in enumerate(bboxes):
                 # Expand bounding box slightly to ensure we get the full sprite
-                padding = self.config["padding"]
                 x = max(0, x - padding)
                 y = max(0, y - padding)
-                w = min(image.width - x, w + padding * 2)
-                h = min(image.height - y, h + padding * 2)
+                w = min(img_w - x, w + padding * 2)
+                h = min(img_h - y, h + padding * 2)
                 
                 row = i // cols
                 col = i % cols
@@ -123,10 +199,10 @@ class EnhancedAssetProcessor:
                 }
                 sprites.append(sprite_info)
         else:
-            print(f"Found {len(valid_contours)} contours, expected {expected_sprites}. Using grid-based approach.")
+            print(f"Found {len(bboxes)} contours, expected {expected_sprites}. Using grid-based approach.")
             # Fall back to grid-based approach
-            sprite_width = image.width // cols
-            sprite_height = image.height // rows
+            sprite_width = img_w // cols
+            sprite_height = img_h // rows
             
             for row in range(rows):
                 for col in range(cols):
@@ -140,17 +216,81 @@ class EnhancedAssetProcessor:
                     }
                     sprites.append(sprite_info)
         
-        return sprites, image
+        return sprites, img_array
+    
+    def load_sheet(self, image_path: str) -> Tuple[np.ndarray, bool, int]:
+        """Decode a sheet to an 8-bit RGBA array, also reporting whether it had an alpha
+        channel and the factor it was scaled down by while decoding"""
+        try:
+            with Image.open(image_path) as header:  # Only parses the header
+                mode = header.mode
+                has_transparency = 'transparency' in header.info
+                flags, reduction = self.imread_flags(header.format, header.width, header.height)
+        except OSError:
+            raise FileNotFoundError(f"Could not load image: {image_path}")
+        
+        # Palette and grayscale+alpha sheets go through PIL so their transparency
+        # is expanded the same way convert('RGBA') always did
+        if mode in ('P', 'PA', 'LA', 'La') or has_transparency:
+            with Image.open(image_path) as img:
+                return np.array(img.convert('RGBA')), True, 1
+        
+        # Decode straight to a numpy array and convert to RGBA in one step
+        img_array = cv2.imread(image_path, flags)
+        if img_array is None:
+            raise FileNotFoundError(f"Could not load image: {image_path}")
+        if img_array.dtype == np.uint16:
+            # 16-bit PNGs decode as uint16; detection and color keying expect 8-bit
+            img_array = (img_array >> 8).astype(np.uint8)
+        elif img_array.dtype != np.uint8:
+            raise ValueError(f"Unsupported sample type {img_array.dtype} in {image_path}")
+        has_alpha = img_array.ndim == 3 and img_array.shape[2] == 4
+        if img_array.ndim == 2:
+            img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2RGBA)
+        elif img_array.shape[2] == 4:
+            img_array = cv2.cvtColor(img_array, cv2.COLOR_BGRA2RGBA)
+        else:
+            img_array = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGBA)
+        return img_array, has_alpha, reduction
+    
+    def imread_flags(self, image_format: str, width: int, height: int) -> Tuple[int, int]:
+        """Pick decode flags and the matching reduction factor, letting libjpeg scale JPEG
+        sheets down while decoding when the cells are far larger than the sprites they
+        get resized to"""
+        if image_format not in ('JPEG', 'MPO'):
+            return cv2.IMREAD_UNCHANGED, 1
+        cell_w = width // (self.config["grid_detection"]["manual_cols"] or 4)
+        cell_h = height // (self.config["grid_detection"]["manual_rows"] or 4)
+        
+        # Largest reduction that still leaves twice the target sprite size per cell.
+        # The reduced modes apply EXIF orientation unless told not to, which
+        # IMREAD_UNCHANGED (and the old PIL path) never did
+        target_w, target_h = self.config["sprite_size"]
+        for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                             (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if cell_w // factor >= target_w * 2 and cell_h // factor >= target_h * 2:
+                return flag | cv2.IMREAD_IGNORE_ORIENTATION, factor
+        return cv2.IMREAD_UNCHANGED, 1
+    
+    def has_transparent_background(self, rgba: np.ndarray) -> bool:
+        """Check the corner pixels' alpha instead of scanning the whole sheet"""
+        alpha = rgba[:, :, 3]
+        return bool((alpha[[0, 0, -1, -1], [0, -1, 0, -1]] == 0).any())
     
-    def detect_grid_from_contours(self, contours: List, image_size: Tuple[int, int]) -> Tuple[int, int]:
-        """Determine grid dimensions from contour positions"""
-        if not contours:
+    def detection_cache_key(self, image_path: str) -> str:
+        """Build a cache key from the sheet's path, mtime, grid detection config and sprite size
+        (the sprite size decides how far JPEG sheets are reduced on decode)"""
+        stat = os.stat(image_path)
+        key = json.dumps([os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size,
+                          self.config["grid_detection"], self.config["sprite_size"]], sort_keys=True)
+        return hashlib.sha1(key.encode()).hexdigest()
+    
+    def detect_grid_from_contours(self, bboxes: List[Tuple[int, int, int, int]], image_size: Tuple[int, int]) -> Tuple[int, int]:
+        """Determine grid dimensions from contour bounding boxes"""
+        if not bboxes:
             return (self.config["grid_detection"]["manual_rows"], 
                    self.config["grid_detection"]["manual_cols"])
         
-        # Get all bounding boxes
-        bboxes = [cv2.boundingRect(c) for c in contours]
-        
         # Extract all unique x and y coordinates
         x_coords = sorted(set(bbox[0] for bbox in bboxes))
         y_coords = sorted(set(bbox[1] for bbox in bboxes))
@@ -160,14 +300,14 @@ class EnhancedAssetProcessor:
         rows = len(y_coords)
         
         # Verify and adjust if needed
-        if rows * cols != len(contours):
+        if rows * cols != len(bboxes):
             # Fall back to default if detection seems incorrect
             rows = self.config["grid_detection"]["manual_rows"]
             cols = self.config["grid_detection"]["manual_cols"]
         
         return rows, cols
     
-    def remove_background(self, sprite_img: Image.Image) -> Image.Image:
+    def remove_background(self, sprite_img: Image.Image) -> np.ndarray:
         """Remove background using improved methods with edge preservation"""
         method = self.config["background_removal"]["method"]
         
@@ -175,84 +315,96 @@ class EnhancedAssetProcessor:
             try:
                 from rembg import remove
                 
-                # Convert PIL image to bytes
-                import io
-                img_byte_arr = io.BytesIO()
-                sprite_img.save(img_byte_arr, format='PNG')
-                img_byte_arr = img_byte_arr.getvalue()
+                # Remove background with higher alpha matting for better edge quality,
+                # reusing one ONNX session rather than rebuilding it per sprite
+                output = remove(sprite_img, session=self.rembg_session(), alpha_matting=True)
                 
-                # Remove background with higher alpha matting for better edge quality
-                output = remove(img_byte_arr, alpha_matting=True)
-                
-                # Convert back to PIL image
-                return Image.open(io.BytesIO(output))
+                # Convert back to an RGBA array
+                return np.array(output.convert('RGBA'))
             except ImportError:
                 print("rembg not installed, falling back to color key method")
                 return self.remove_background_color_key(sprite_img)
         else:
             return self.remove_background_color_key(sprite_img)
     
-    def remove_background_color_key(self, image: Image.Image) -> Image.Image:
+    def rembg_session(self):
+        """Lazily create the rembg session shared by every sprite"""
+        if self._rembg_session is None:
+            from rembg import new_session
+            settings = self.config["background_removal"]
+            if settings.get("rembg_model_path"):
+                # e.g. the int8 model produced by quantize_rembg_model.py
+                self._rembg_session = new_session("u2net_custom", model_path=settings["rembg_model_path"])
+            else:
+                self._rembg_session = new_session(settings.get("rembg_model", "u2netp"))
+        return self._rembg_session
+    
+    def remove_background_color_key(self, image: Image.Image) -> np.ndarray:
         """Enhanced color key background removal with edge improvements"""
         # Convert to RGBA if not already
         if image.mode != 'RGBA':
             image = image.convert('RGBA')
         
         # Get image data as numpy array
-        data = np.array(image)
-        
+        return self.apply_color_key(np.array(image))
+    
+    def apply_color_key(self, data: np.ndarray) -> np.ndarray:
+        """Key out the background color of an RGBA array in place"""
         # Define the color to remove and tolerance
         target_color = np.array(self.config["background_removal"]["color_key"])
         tolerance = self.config["background_removal"]["tolerance"]
         
-        # Calculate color distance
-        diff = np.abs(data[:, :, :3].astype(int) - target_color.astype(int))
-        color_distance = np.sum(diff, axis=2)
-        
-        # Create mask where color distance is within tolerance
-        mask = color_distance <= (tolerance * 3)  # multiply by 3 for RGB channels
-        
-        # Set alpha channel to 0 for matching pixels
-        data[mask, 3] = 0
-        
-        # Convert back to PIL
-        result = Image.fromarray(data, 'RGBA')
+        if _color_key_alpha is not None:
+            # Fused distance + mask + alpha write, one pass over the pixels
+            data = np.ascontiguousarray(data)
+            tr, tg, tb = (int(c) for c in target_color[:3])
+            _color_key_alpha(data, tr, tg, tb, tolerance * 3)
+        else:
+            # Calculate color distance (stay in uint8/uint16 rather than widening to int64)
+            rgb = np.ascontiguousarray(data[:, :, :3])
+            target = np.ascontiguousarray(np.broadcast_to(target_color.astype(np.uint8), rgb.shape))
+            diff = cv2.absdiff(rgb, target)
+            color_distance = diff.sum(axis=2, dtype=np.uint16)
+            
+            # Create mask where color distance is within tolerance
+            mask = color_distance <= (tolerance * 3)  # multiply by 3 for RGB channels
+            
+            # Set alpha channel to 0 for matching pixels
+            data[mask, 3] = 0
         
-        # Apply slight blur to alpha channel to smooth edges
-        r, g, b, a = result.split()
-        a = a.filter(ImageFilter.GaussianBlur(radius=0.5))
-        result = Image.merge('RGBA', (r, g, b, a))
+        # Apply slight blur to alpha channel to smooth edges (a 3-tap box is
+        # indistinguishable from the 0.5 radius Gaussian and cheaper)
+        data[:, :, 3] = cv2.boxFilter(np.ascontiguousarray(data[:, :, 3]), -1, (3, 3))
         
-        return result
+        return data
     
-    def trim_sprite(self, sprite_img: Image.Image) -> Image.Image:
+    def trim_sprite(self, sprite: np.ndarray) -> np.ndarray:
         """Trim empty space around sprite while preserving full character proportions"""
-        # Get the alpha channel
-        _, _, _, alpha = sprite_img.split()
-        
-        # Get bounding box of non-transparent pixels
-        bbox = ImageOps.invert(alpha).getbbox()
+        # Get bounding box of pixels that aren't fully opaque straight from the alpha plane
+        # (the same box ImageOps.invert(alpha).getbbox() gave)
+        x, y, w, h = cv2.boundingRect((sprite[:, :, 3] < 255).astype(np.uint8))
         
-        if bbox:
+        if w and h:
             # Calculate padding to maintain character proportions
             target_size = tuple(self.config["sprite_size"])
             
             # Crop to bounding box with a little extra padding
-            padding = 5  # Additional padding to avoid tight cropping
-            x1, y1, x2, y2 = bbox
-            x1 = max(0, x1 - padding)
-            y1 = max(0, y1 - padding)
-            x2 = min(sprite_img.width, x2 + padding)
-            y2 = min(sprite_img.height, y2 + padding)
+            padding = 5  # Additional padding to avoid tight cropping (not scaled for reduced JPEG decodes)
+            sprite_height, sprite_width = sprite.shape[:2]
+            x1 = max(0, x - padding)
+            y1 = max(0, y - padding)
+            x2 = min(sprite_width, x + w + padding)
+            y2 = min(sprite_height, y + h + padding)
             
-            trimmed = sprite_img.crop((x1, y1, x2, y2))
+            trimmed = sprite[y1:y2, x1:x2]
+            trimmed_height, trimmed_width = trimmed.shape[:2]
             
             # Calculate positioning - we want to preserve the character's feet position
             # by aligning the bottom of the sprite with the bottom of the target
-            aspect_ratio = trimmed.width / trimmed.height
+            aspect_ratio = trimmed_width / trimmed_height
             
             # Resize maintaining aspect ratio
-            if trimmed.width > trimmed.height:
+            if trimmed_width > trimmed_height:
                 # Width constrained
                 new_width = target_size[0]
                 new_height = int(new_width / aspect_ratio)
@@ -269,21 +421,29 @@ class EnhancedAssetProcessor:
                     new_width = target_size[0]
                     new_height = int(new_width / aspect_ratio)
             
-            # Resize with high quality
-            resized = trimmed.resize((new_width, new_height), Image.LANCZOS)
+            # Pick the cheapest filter that still looks right for this scale factor
+            scale = max(new_width / trimmed_width, new_height / trimmed_height)
+            if scale < 0.5:
+                interpolation = cv2.INTER_AREA
+            elif scale < 1.0:
+                interpolation = cv2.INTER_CUBIC
+            else:
+                interpolation = cv2.INTER_LANCZOS4
+            resized = cv2.resize(trimmed, (new_width, new_height), interpolation=interpolation)
             
-            # Create a new image with target size
-            new_img = Image.new('RGBA', target_size, (0, 0, 0, 0))
+            # Create transparent canvas of target size
+            canvas = np.zeros((target_size[1], target_size[0], 4), np.uint8)
             
             # Center horizontally but align to bottom for proper "feet" placement
             paste_x = (target_size[0] - new_width) // 2
             paste_y = target_size[1] - new_height  # Align to bottom
             
-            new_img.paste(resized, (paste_x, paste_y), resized)
-            return new_img
+            # The destination is fully transparent, so a plain copy replaces the alpha composite
+            canvas[paste_y:paste_y + new_height, paste_x:paste_x + new_width] = resized
+            
+            return canvas
         
-        return sprite_img
-        return sprite_img
+        return sprite
     
     def name_sprite(self, character_name: str, row: int, col: int) -> str:
         """Generate sprite name based on its position in the sheet"""
@@ -298,49 +458,98 @@ class EnhancedAssetProcessor:
         
         return f"{character_name}_{action}_{direction}"
     
-    def process_character_sheet(self, image_path: str):
+    def process_character_sheet(self, image_path: str) -> Tuple[str, Dict[str, str]]:
         """Process a character sheet to extract sprites"""
         # Get character name from filename
         file_name = os.path.basename(image_path)
         character_name = os.path.splitext(file_name)[0]
         
-        # Create character directory
         character_dir = os.path.join(self.config["output_dir"], "characters", character_name)
+        
+        # Per-sheet constants for building output paths
+        output_format = self.config["output_format"]
+        ext = output_format.lower()
+        rel_root = f"assets/game/characters/{character_name}"
+        out_root = os.path.join(character_dir, "")
+        
+        # Reuse the sprites already on disk if neither the sheet nor the output config
+        # changed since they were written
+        if self.is_up_to_date(image_path, character_dir, character_name):
+            print(f"Skipping unchanged sheet: {image_path}")
+            manifest_char = self.asset_manifest["assets"][character_name] = dict(self._previous_assets[character_name])
+            return character_name, manifest_char
+        
+        # Create character directory
         os.makedirs(character_dir, exist_ok=True)
         
         # Initialize character in asset manifest
-        self.asset_manifest["assets"][character_name] = {}
+        manifest_char = self.asset_manifest["assets"][character_name] = {}
         
         # Detect sprites in the image
-        sprites, full_image = self.detect_sprites(image_path)
-        
-        # Process each sprite
-        for sprite_info in sprites:
-            bounds = sprite_info["bounds"]
-            row = sprite_info["row"]
-            col = sprite_info["col"]
-            
-            # Extract sprite from sheet
-            sprite_img = full_image.crop(bounds)
-            
-            # Remove background
-            sprite_img = self.remove_background(sprite_img)
-            
-            # Trim and resize sprite
-            sprite_img = self.trim_sprite(sprite_img)
-            
-            # Generate sprite name
-            sprite_name = self.name_sprite(character_name, row, col)
-            
-            # Save sprite
-            output_format = self.config["output_format"]
-            output_path = os.path.join(character_dir, f"{sprite_name}.{output_format.lower()}")
-            sprite_img.save(output_path, output_format)
-            print(f"Saved sprite: {output_path}")
+        sprites, sheet = self.detect_sprites(image_path)
+        sheet_keyed = self.config["background_removal"]["method"] != "rembg"
+        
+        # Names only depend on (row % actions, col % directions), so build every one up front
+        num_actions = len(self.config["naming"]["actions"])
+        num_directions = len(self.config["naming"]["directions"])
+        name_table = [[self.name_sprite(character_name, a, d) for d in range(num_directions)]
+                      for a in range(num_actions)]
+        
+        # Process each sprite, encoding/writing on a thread pool so saves overlap
+        # with the next sprite's processing
+        with ThreadPoolExecutor(max_workers=4) as save_pool:
+            save_futures = []
+            for sprite_info in sprites:
+                bounds = sprite_info["bounds"]
+                row = sprite_info["row"]
+                col = sprite_info["col"]
+                
+                # Extract sprite from sheet
+                x1, y1, x2, y2 = bounds
+                sprite = sheet[y1:y2, x1:x2]
+                if not sheet_keyed:
+                    # Background wasn't removed across the whole sheet, do it per sprite
+                    sprite = self.remove_background(Image.fromarray(sprite, 'RGBA'))
+                
+                # Trim and resize sprite
+                sprite = self.trim_sprite(sprite)
+                
+                # Generate sprite name
+                sprite_name = name_table[row % num_actions][col % num_directions]
+                
+                # Save sprite
+                output_path = f"{out_root}{sprite_name}.{ext}"
+                save_futures.append(save_pool.submit(self.save_sprite, sprite, output_path, output_format))
+                
+                # Add to asset manifest
+                manifest_char[sprite_name] = f"{rel_root}/{sprite_name}.{ext}"
             
-            # Add to asset manifest
-            relative_path = os.path.join("assets/game/characters", character_name, f"{sprite_name}.{output_format.lower()}")
-            self.asset_manifest["assets"][character_name][sprite_name] = relative_path
+            # Wait for pending writes and surface any save errors
+            for future in as_completed(save_futures):
+                future.result()
+        print(f"Saved {len(save_futures)} sprites to {character_dir}")
+        
+        # Overwriting sprites doesn't touch the directory mtime, so mark it fresh explicitly
+        os.utime(character_dir)
+        
+        return character_name, manifest_char
+    
+    def is_up_to_date(self, image_path: str, character_dir: str, character_name: str) -> bool:
+        """Check whether a sheet's extracted sprites are newer than the sheet itself
+        (previous assets are only loaded when the output config hash matches)"""
+        if character_name not in self._previous_assets or not os.path.isdir(character_dir):
+            return False
+        return os.path.getmtime(image_path) <= os.path.getmtime(character_dir)
+    
+    def save_sprite(self, sprite: np.ndarray, output_path: str, output_format: str):
+        """Encode and write a single RGBA sprite"""
+        if output_format.lower() == "qoi":
+            import qoi
+            qoi.write(output_path, np.ascontiguousarray(sprite))
+        else:
+            # Fast zlib setting by default - these are intermediate assets, encode speed beats size
+            Image.fromarray(sprite, 'RGBA').save(output_path, output_format, optimize=False,
+                                                 compress_level=self.config.get("png_compress_level", 1))
     
     def save_asset_manifest(self):
         """Save the asset manifest to JSON"""
@@ -349,8 +558,8 @@ class EnhancedAssetProcessor:
             json.dump(self.asset_manifest, f, indent=2)
         print(f"Asset manifest saved to: {output_path}")
     
-    def process_all(self):
-        """Process all character sheets in the input directory"""
+    def process_all(self, jobs: Optional[int] = None):
+        """Process all character sheets in the input directory using up to `jobs` worker processes"""
         input_dir = self.config["input_dir"]
         
         # Get all image files
@@ -362,22 +571,47 @@ class EnhancedAssetProcessor:
             print(f"No image files found in {input_dir}")
             return
         
-        # Process each file
-        for image_path in image_files:
-            self.process_character_sheet(str(image_path))
+        # Process each file in its own worker - sheets share no state
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count(),
+                                 initializer=_init_worker, initargs=(self.config,)) as executor:
+            futures = [executor.submit(_process_one, str(image_path)) for image_path in image_files]
+            for future in futures:
+                character_name, sprites = future.result()
+                self.asset_manifest["assets"][character_name] = sprites
         
         # Save asset manifest
         self.save_asset_manifest()
         print("Asset processing complete!")
 
+# Per-process processor, built once by _init_worker and reused for every sheet the worker handles
+_worker_processor: Optional[EnhancedAssetProcessor] = None
+
+def _init_worker(config: Dict):
+    """Worker initializer: build this process's processor from the parent's config"""
+    global _worker_processor
+    # The pool already uses every core, so keep OpenCV and the numba kernel single-threaded
+    cv2.setNumThreads(1)
+    if njit is not None:
+        set_num_threads(1)
+    # Directories are already set up by the parent, so don't re-clean them here
+    _worker_processor = EnhancedAssetProcessor(config=config, setup_directories=False)
+    _worker_processor._use_opencl = cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+
+def _process_one(image_path: str) -> Tuple[str, Dict[str, str]]:
+    """Worker entrypoint: process one sheet with this process's processor"""
+    return _worker_processor.process_character_sheet(image_path)
+
 def main():
     parser = argparse.ArgumentParser(description="Enhanced Asset Processor for game sprites")
     parser.add_argument('--config', default='tools/asset_config.json', help='Path to config file')
+    parser.add_argument('--force', action='store_true', help='Clean output and re-process every sheet')
+    parser.add_argument('--jobs', type=int, help='Worker processes (default: one per CPU; lower it if memory runs short)')
     args = parser.parse_args()
     
+    print(f"Using Pillow {PIL.__version__}")
     start_time = time.time()
-    processor = EnhancedAssetProcessor(args.config)
-    processor.process_all()
+    processor = EnhancedAssetProcessor(args.config, force=args.force)
+    processor.process_all(jobs=args.jobs)
     print(f"Processing completed in {time.time() - start_time:.2f} seconds")
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ Better grid detection and duplicate filtering
 
 import cv2
 import numpy as np
+import PIL
 from PIL import Image
 import os
 import json
@@ -13,14 +14,54 @@ import argparse
 from pathlib import Path
 import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _grid_keys(bb, height, width, grid_rows, grid_cols):
+    """Row and column index of every (x, y, w, h) box in an int32 array"""
+    row_height = max(height // max(grid_rows, 1), 1)
+    col_width = max(width // max(grid_cols, 1), 1)
+    return bb[:, 1] // row_height, bb[:, 0] // col_width
+
+def _group_rows(ys, row_tolerance):
+    """Row index for each of the ascending y coordinates: a new row starts at the first
+    sprite more than row_tolerance below the first sprite of the current row"""
+    row_ids = np.empty(len(ys), dtype=np.int32)
+    row = 0
+    row_start = ys[0] if len(ys) else 0
+    for i in range(len(ys)):
+        if ys[i] - row_start > row_tolerance:
+            row += 1
+            row_start = ys[i]
+        row_ids[i] = row
+    return row_ids
+
+if njit is not None:
+    _grid_keys = njit(cache=True)(_grid_keys)
+    _group_rows = njit(cache=True)(_group_rows)
 
 class ImprovedVisualExtractor:
-    def __init__(self, config_file: str = "asset_config.json"):
+    def __init__(self, config_file: str = "asset_config.json", config: dict = None):
         """Initialize the improved visual sprite extractor"""
-        self.load_config(config_file)
+        if config is not None:
+            self.config = config
+        else:
+            self.load_config(config_file)
         self.min_sprite_area = 800  # Minimum area for a valid sprite
         self.max_sprite_area = 50000  # Maximum area to filter out large backgrounds
         self.padding = 5  # Reduced padding for tighter extraction
+        self.adaptive_threshold = self.config.get("adaptive_threshold", False)  # Extra edge-detection pass
+        self._morph_kernel = np.ones((3, 3), np.uint8)  # Shared by the CLOSE/OPEN cleanup
         
         # Sprite naming patterns - try different patterns to find the right one
         self.naming_patterns = {
@@ -53,7 +94,7 @@ class ImprovedVisualExtractor:
             "version": "1.0", 
             "assets": {}, 
             "sprite_size": self.config.get("sprite_size", [96, 96]), 
-            "format": "PNG"
+            "format": self.config.get("output_format", "PNG").upper()
         }
         
     def load_config(self, config_file: str):
@@ -79,26 +120,15 @@ class ImprovedVisualExtractor:
             return 4, 4  # Default fallback
             
         # Group sprites by similar Y coordinates (rows)
-        y_positions = [sprite['bbox'][1] for sprite in sprites_data]
-        y_positions.sort()
+        y_positions = np.sort(np.array([sprite['bbox'][1] for sprite in sprites_data], dtype=np.int32))
         
-        # Find row groups with tolerance
+        # Find row groups with tolerance: a new row starts once a sprite is more than
+        # 30px below the first sprite of the current row
         row_tolerance = 30
-        rows = []
-        current_row_y = y_positions[0]
-        current_row_count = 1
-        
-        for y in y_positions[1:]:
-            if abs(y - current_row_y) <= row_tolerance:
-                current_row_count += 1
-            else:
-                rows.append(current_row_count)
-                current_row_y = y
-                current_row_count = 1
-        rows.append(current_row_count)
+        rows = np.bincount(_group_rows(y_positions, row_tolerance))
         
         # Most common row size is likely the grid width
-        grid_cols = max(set(rows), key=rows.count) if rows else 4
+        grid_cols = int(np.bincount(rows).argmax())
         grid_rows = len(rows)
         
         # Ensure we have a reasonable grid
@@ -109,9 +139,9 @@ class ImprovedVisualExtractor:
             
         return grid_rows, grid_cols
     
-    def generate_sprite_name(self, character_name: str, row: int, col: int) -> str:
-        """Generate sprite name using the current naming pattern"""
-        pattern = self.naming_patterns[self.current_pattern]
+    def generate_sprite_name(self, character_name: str, row: int, col: int, pattern_name: str = None) -> str:
+        """Generate sprite name using the given (or current) naming pattern"""
+        pattern = self.naming_patterns[pattern_name or self.current_pattern]
         
         row_name = pattern["row_mapping"].get(row, f"row{row}")
         col_name = pattern["col_mapping"].get(col, f"col{col}")
@@ -162,113 +192,124 @@ class ImprovedVisualExtractor:
         
         return result
     
-    def filter_overlapping_sprites(self, sprites_data):
+    def filter_overlapping_sprites(self, sprites_data, cell_size: int = 100):
         """Remove sprites that significantly overlap with others"""
         filtered_sprites = []
-        
-        def calculate_overlap_ratio(box1, box2):
-            """Calculate overlap ratio between two bounding boxes"""
-            x1, y1, w1, h1 = box1
-            x2, y2, w2, h2 = box2
-            
-            # Calculate intersection
-            left = max(x1, x2)
-            top = max(y1, y2)
-            right = min(x1 + w1, x2 + w2)
-            bottom = min(y1 + h1, y2 + h2)
-            
-            if left >= right or top >= bottom:
-                return 0
-            
-            intersection_area = (right - left) * (bottom - top)
-            box1_area = w1 * h1
-            box2_area = w2 * h2
-            
-            return intersection_area / min(box1_area, box2_area)
+        # Spatial hash of accepted boxes: every (x // cell, y // cell) cell a box touches
+        # maps to its index, so each candidate is only tested against accepted sprites
+        # it can actually intersect instead of all of them
+        grid = defaultdict(list)
         
         # Sort by area (keep larger sprites when there's overlap)
         sprites_data.sort(key=lambda s: s['area'], reverse=True)
         
         for sprite in sprites_data:
-            # Check if this sprite significantly overlaps with any already accepted sprite
-            overlaps_significantly = False
-            for accepted_sprite in filtered_sprites:
-                overlap_ratio = calculate_overlap_ratio(sprite['bbox'], accepted_sprite['bbox'])
-                if overlap_ratio > 0.5:  # More than 50% overlap
-                    overlaps_significantly = True
+            x, y, w, h = sprite['bbox']
+            cells = [(cx, cy)
+                     for cx in range(x // cell_size, (x + w - 1) // cell_size + 1)
+                     for cy in range(y // cell_size, (y + h - 1) // cell_size + 1)]
+            
+            overlaps = False
+            checked = set()
+            for cell in cells:
+                for idx in grid[cell]:
+                    if idx in checked:
+                        continue
+                    checked.add(idx)
+                    ax, ay, aw, ah = filtered_sprites[idx]['bbox']
+                    
+                    # Intersection with the accepted sprite
+                    iw = min(ax + aw, x + w) - max(ax, x)
+                    ih = min(ay + ah, y + h) - max(ay, y)
+                    if iw <= 0 or ih <= 0:
+                        continue
+                    
+                    # Overlap relative to the smaller of the two boxes. This is deliberately not
+                    # IoU (as in cv2.dnn.NMSBoxes): a small box nested inside a big one has a low
+                    # IoU but is still a duplicate detection of the same sprite
+                    if iw * ih / min(aw * ah, w * h) > 0.5:  # More than 50% overlap
+                        overlaps = True
+                        break
+                if overlaps:
                     break
             
-            if not overlaps_significantly:
+            # Keep the sprite if it doesn't significantly overlap any already accepted sprite
+            if not overlaps:
+                for cell in cells:
+                    grid[cell].append(len(filtered_sprites))
                 filtered_sprites.append(sprite)
         
         return filtered_sprites
     
     def extract_sprites_improved(self, image_path: str, character_name: str):
         """Extract sprites with improved detection and filtering"""
+        character_name, manifest_fragment, extracted_count = self.extract_sheet(image_path, character_name)
+        if manifest_fragment is not None:
+            self.asset_manifest["assets"][character_name] = manifest_fragment
+        return extracted_count
+    
+    def extract_sheet(self, image_path: str, character_name: str) -> tuple:
+        """Extract one sheet's sprites, returning (character_name, manifest_fragment, sprite_count)
+        without touching self.asset_manifest so it can run in a worker process"""
+        analysis = self._analyze(image_path)
+        if analysis is None:
+            return character_name, None, 0
+        return self._emit(analysis, character_name, self.current_pattern)
+    
+    def _analyze(self, image_path: str):
+        """Detect, filter and order the sprites in a sheet.
         
+        This is the expensive, naming-independent part of extraction.
+        Returns (original, sprites, grid_rows, grid_cols), or None if the image can't be loaded.
+        """
         print(f"Processing image: {image_path}")
         
         # Load image
         img = cv2.imread(image_path)
         if img is None:
             print(f"Error: Could not load image {image_path}")
-            return 0
+            return None
             
-        original = img.copy()
+        # Nothing below writes to img, so the crops can come straight from it
+        original = img
         height, width = img.shape[:2]
         
-        # Enhanced preprocessing for white background detection
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Multiple detection methods
-        # 1. Simple thresholding for white background
-        _, thresh1 = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
+        # Non-white foreground mask for white background detection, in a single pass:
+        # any channel below 240 covers both the gray threshold and the color-based mask
+        combined = (img.min(axis=2) < 240).view(np.uint8) * 255
         
-        # 2. Adaptive thresholding
-        thresh2 = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                       cv2.THRESH_BINARY_INV, 11, 2)
-        
-        # 3. Color-based detection in original image
-        # Create mask for non-white pixels
-        lower_white = np.array([240, 240, 240])
-        upper_white = np.array([255, 255, 255])
-        white_mask = cv2.inRange(img, lower_white, upper_white)
-        color_thresh = cv2.bitwise_not(white_mask)
-        
-        # Combine detection methods
-        combined = cv2.bitwise_or(thresh1, thresh2)
-        combined = cv2.bitwise_or(combined, color_thresh)
+        # Optional adaptive thresholding pass to catch faint anti-aliased edges
+        if self.adaptive_threshold:
+            # Green channel stands in for gray on white backgrounds (no weighted conversion pass)
+            gray = np.ascontiguousarray(img[:, :, 1])
+            thresh2 = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                           cv2.THRESH_BINARY_INV, 11, 2)
+            cv2.bitwise_or(combined, thresh2, dst=combined)
         
         # Morphological operations to clean up
-        kernel = np.ones((3, 3), np.uint8)
-        combined = cv2.morphologyEx(combined, cv2.MORPH_CLOSE, kernel)
-        combined = cv2.morphologyEx(combined, cv2.MORPH_OPEN, kernel)
-        
-        # Find contours
-        contours, _ = cv2.findContours(combined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Filter contours to find valid sprites
-        potential_sprites = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if self.min_sprite_area <= area <= self.max_sprite_area:
-                x, y, w, h = cv2.boundingRect(contour)
-                
-                # Additional filtering
-                aspect_ratio = w / h
-                extent = area / (w * h)
-                
-                if (0.2 < aspect_ratio < 5.0 and  # Allow wider range for different poses
-                    extent > 0.1 and  # At least 10% filled
-                    w > 30 and h > 40 and  # Minimum meaningful size
-                    w < width * 0.9 and h < height * 0.9):  # Not entire image
-                    
-                    potential_sprites.append({
-                        'bbox': (x, y, w, h),
-                        'area': area,
-                        'aspect_ratio': aspect_ratio,
-                        'extent': extent
-                    })
+        cv2.morphologyEx(combined, cv2.MORPH_CLOSE, self._morph_kernel, dst=combined)
+        cv2.morphologyEx(combined, cv2.MORPH_OPEN, self._morph_kernel, dst=combined)
+        
+        # Find blobs - one call yields the bounding box and pixel area of every component
+        _, _, stats, _ = cv2.connectedComponentsWithStats(combined, connectivity=8)
+        stats = stats[1:]  # Skip the background label
+        x, y, w, h, area = stats.T
+        aspect_ratio = w / h
+        extent = area / (w * h)
+        
+        # Filter components to find valid sprites
+        mask = ((self.min_sprite_area <= area) & (area <= self.max_sprite_area) &
+                (0.2 < aspect_ratio) & (aspect_ratio < 5.0) &  # Allow wider range for different poses
+                (extent > 0.1) &  # At least 10% filled
+                (w > 30) & (h > 40) &  # Minimum meaningful size
+                (w < width * 0.9) & (h < height * 0.9))  # Not entire image
+        
+        potential_sprites = [{
+            'bbox': (int(x[i]), int(y[i]), int(w[i]), int(h[i])),
+            'area': int(area[i]),
+            'aspect_ratio': float(aspect_ratio[i]),
+            'extent': float(extent[i])
+        } for i in np.flatnonzero(mask)]
         
         print(f"Found {len(potential_sprites)} potential sprites")
         
@@ -281,142 +322,178 @@ class ImprovedVisualExtractor:
         print(f"Detected grid: {grid_rows} rows x {grid_cols} cols")
         
         # Sort sprites by position (top-to-bottom, left-to-right)
-        def sort_key(sprite):
-            x, y, w, h = sprite['bbox']
-            # Group by rows first (with some tolerance), then by columns
-            row = y // (height // max(grid_rows, 1))
-            col = x // (width // max(grid_cols, 1))
-            return (row, col)
-        
-        filtered_sprites.sort(key=sort_key)
+        # Group by rows first (with some tolerance), then by columns
+        if filtered_sprites:
+            bb = np.array([s['bbox'] for s in filtered_sprites], dtype=np.int32)
+            rows, cols = _grid_keys(bb, height, width, grid_rows, grid_cols)
+            order = np.lexsort((cols, rows))
+            filtered_sprites = [filtered_sprites[i] for i in order]
         
         # Take only the expected number of sprites
         expected_sprites = min(len(filtered_sprites), grid_rows * grid_cols)
         filtered_sprites = filtered_sprites[:expected_sprites]
         
+        return original, filtered_sprites, grid_rows, grid_cols
+    
+    def _emit(self, analysis, character_name: str, pattern_name: str) -> tuple:
+        """Name, process and save the sprites found by _analyze using the given naming pattern"""
+        original, filtered_sprites, grid_rows, grid_cols = analysis
+        
         # Create character directory
         character_dir = os.path.join(self.config["output_dir"], "characters", character_name)
         os.makedirs(character_dir, exist_ok=True)
         
-        # Initialize character in asset manifest
-        self.asset_manifest["assets"][character_name] = {}
+        # Manifest entries for this character
+        manifest_fragment = {}
         
         # Extract and save sprites
-        actions = self.config["naming"]["actions"]
-        directions = self.config["naming"]["directions"]
-        
         extracted_count = 0
-        for i, sprite_info in enumerate(filtered_sprites):
-            x, y, w, h = sprite_info['bbox']
-            
-            # Add minimal padding
-            x1 = max(0, x - self.padding)
-            y1 = max(0, y - self.padding)
-            x2 = min(img.shape[1], x + w + self.padding)
-            y2 = min(img.shape[0], y + h + self.padding)
-            
-            # Extract sprite
-            sprite = original[y1:y2, x1:x2]
-            
-            # Convert to PIL
-            sprite_pil = Image.fromarray(cv2.cvtColor(sprite, cv2.COLOR_BGR2RGB))
-            
-            # Make background transparent
-            sprite_pil = self.make_background_transparent(sprite_pil)
-            
-            # Resize appropriately
-            sprite_pil = self.resize_sprite_smart(sprite_pil)
-            
-            # Calculate grid position
-            row = i // grid_cols
-            col = i % grid_cols
-            
-            # Generate name based on grid position using current pattern
-            sprite_name = self.generate_sprite_name(character_name, row, col)
-            output_path = os.path.join(character_dir, f"{sprite_name}.png")
-            
-            sprite_pil.save(output_path)
-            print(f"Extracted: {sprite_name} ({w}x{h} -> {sprite_pil.size[0]}x{sprite_pil.size[1]}) at position ({row},{col})")
-            
-            # Add to manifest
-            self.asset_manifest["assets"][character_name][sprite_name] = {
-                "path": f"characters/{character_name}/{sprite_name}.png",
-                "size": list(sprite_pil.size),
-                "original_bounds": [x, y, w, h],
-                "grid_position": [row, col]
-            }
+        # Fast zlib level for dev-time extraction; raise "png_compress_level" (up to 9) for release builds
+        compress_level = self.config.get("png_compress_level", 1)
+        # "WEBP" trades PNG for lossless WebP at its fastest method, which usually encodes quicker.
+        # The config is shared with the enhanced processor, so other formats (e.g. QOI) fall back to PNG
+        output_format = self.config.get("output_format", "PNG").upper()
+        if output_format == "WEBP":
+            save_options = {"format": "WEBP", "lossless": True, "quality": 100, "method": 0}
+        else:
+            output_format = "PNG"
+            save_options = {"format": "PNG", "compress_level": compress_level, "optimize": False}
+        ext = output_format.lower()
+        
+        # Names depend only on (row, col) for a fixed character and pattern, so build them once
+        name_table = [[self.generate_sprite_name(character_name, row, col, pattern_name)
+                       for col in range(grid_cols)] for row in range(grid_rows)]
+        
+        # PNG encoding releases the GIL, so saves run in the background while
+        # the next sprite is being processed
+        with ThreadPoolExecutor(max_workers=4) as io_pool:
+            save_futures = []
+            for i, sprite_info in enumerate(filtered_sprites):
+                x, y, w, h = sprite_info['bbox']
+                
+                # Add minimal padding
+                x1 = max(0, x - self.padding)
+                y1 = max(0, y - self.padding)
+                x2 = min(original.shape[1], x + w + self.padding)
+                y2 = min(original.shape[0], y + h + self.padding)
+                
+                # Extract sprite
+                sprite = original[y1:y2, x1:x2]
+                
+                # Convert to RGBA - the sprite stays a numpy array until it is encoded
+                sprite = cv2.cvtColor(sprite, cv2.COLOR_BGR2RGBA)
+                
+                # Make background transparent
+                sprite = self.make_background_transparent(sprite)
+                
+                # Resize appropriately
+                sprite = self.resize_sprite_smart(sprite)
+                sprite_size = [sprite.shape[1], sprite.shape[0]]
+                
+                # Calculate grid position
+                row = i // grid_cols
+                col = i % grid_cols
+                
+                # Generate name based on grid position using current pattern
+                sprite_name = name_table[row][col]
+                output_path = os.path.join(character_dir, f"{sprite_name}.{ext}")
+                
+                save_futures.append(io_pool.submit(Image.fromarray(sprite, 'RGBA').save, output_path,
+                                                   **save_options))
+                print(f"Extracted: {sprite_name} ({w}x{h} -> {sprite_size[0]}x{sprite_size[1]}) at position ({row},{col})")
+                
+                # Add to manifest
+                manifest_fragment[sprite_name] = {
+                    "path": f"characters/{character_name}/{sprite_name}.{ext}",
+                    "size": sprite_size,
+                    "original_bounds": [x, y, w, h],
+                    "grid_position": [row, col]
+                }
+                
+                extracted_count += 1
             
-            extracted_count += 1
+            # Wait for the writes to finish and surface any save errors
+            for future in save_futures:
+                future.result()
         
-        return extracted_count
+        return character_name, manifest_fragment, extracted_count
     
-    def make_background_transparent(self, image: Image.Image) -> Image.Image:
-        """Convert white background to transparent with better edge handling"""
-        image = image.convert("RGBA")
-        data = np.array(image)
-        
+    def make_background_transparent(self, data: np.ndarray) -> np.ndarray:
+        """Convert white background of an RGBA array to transparent (in place) with better edge handling"""
         # Create transparency for white-ish pixels
         # Use a more sophisticated approach for better edge quality
         white_threshold_high = 245  # Very white pixels
         white_threshold_low = 230   # Somewhat white pixels
         
         # Calculate "whiteness" score
-        whiteness = np.minimum(np.minimum(data[:, :, 0], data[:, :, 1]), data[:, :, 2])
+        whiteness = data[:, :, :3].min(axis=2)
         
-        # Fully transparent for very white pixels
-        very_white_mask = whiteness >= white_threshold_high
-        data[very_white_mask] = [255, 255, 255, 0]
+        # Alpha ramps linearly from opaque at the low threshold to fully transparent
+        # at the high one, computed for the whole plane in a single expression
+        ramp_step = 255 // (white_threshold_high - white_threshold_low)
+        alpha_reduction = (whiteness.astype(np.int16) - white_threshold_low) * ramp_step
+        data[:, :, 3] = 255 - np.clip(alpha_reduction, 0, 255)
         
-        # Partially transparent for somewhat white pixels
-        somewhat_white_mask = (whiteness >= white_threshold_low) & (whiteness < white_threshold_high)
-        alpha_reduction = ((whiteness[somewhat_white_mask] - white_threshold_low) / 
-                          (white_threshold_high - white_threshold_low) * 255).astype(np.uint8)
-        data[somewhat_white_mask, 3] = 255 - alpha_reduction
+        # Very white pixels also get bleached to pure white
+        data[:, :, :3][whiteness >= white_threshold_high] = 255
         
-        return Image.fromarray(data)
+        return data
     
-    def resize_sprite_smart(self, sprite: Image.Image) -> Image.Image:
-        """Resize sprite maintaining aspect ratio and proper alignment"""
+    def resize_sprite_smart(self, sprite: np.ndarray) -> np.ndarray:
+        """Resize an RGBA sprite array maintaining aspect ratio and proper alignment"""
         target_size = tuple(self.config["sprite_size"])
+        sprite_height, sprite_width = sprite.shape[:2]
         
         # Calculate scaling to fit within target size
-        scale_x = target_size[0] / sprite.width
-        scale_y = target_size[1] / sprite.height
+        scale_x = target_size[0] / sprite_width
+        scale_y = target_size[1] / sprite_height
         scale = min(scale_x, scale_y)
         
         # Calculate new size
-        new_width = int(sprite.width * scale)
-        new_height = int(sprite.height * scale)
+        new_width = int(sprite_width * scale)
+        new_height = int(sprite_height * scale)
         
-        # Resize with high quality
-        sprite_resized = sprite.resize((new_width, new_height), Image.LANCZOS)
+        # LANCZOS only pays off when upscaling; for shrinking, area interpolation looks
+        # the same and is much cheaper. "resize_quality": "lanczos" forces LANCZOS everywhere
+        if scale < 1.0 and self.config.get("resize_quality", "fast") != "lanczos":
+            interpolation = cv2.INTER_AREA
+        else:
+            interpolation = cv2.INTER_LANCZOS4
+        sprite_resized = cv2.resize(sprite, (new_width, new_height), interpolation=interpolation)
         
-        # Create result image
-        result = Image.new('RGBA', target_size, (0, 0, 0, 0))
+        # Create result canvas
+        result = np.zeros((target_size[1], target_size[0], 4), np.uint8)
         
         # Position sprite (center horizontally, align to bottom)
         paste_x = (target_size[0] - new_width) // 2
         paste_y = target_size[1] - new_height
         
-        result.paste(sprite_resized, (paste_x, paste_y), sprite_resized)
+        result[paste_y:paste_y + new_height, paste_x:paste_x + new_width] = sprite_resized
         
         return result
     
     def save_asset_manifest(self):
         """Save asset manifest"""
         output_path = os.path.join(self.config["output_dir"], "asset_manifest.json")
-        with open(output_path, 'w') as f:
-            json.dump(self.asset_manifest, f, indent=2)
+        if orjson is not None:
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(self.asset_manifest,
+                                     option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(output_path, 'w') as f:
+                json.dump(self.asset_manifest, f, indent=2)
         print(f"Asset manifest saved to: {output_path}")
     
     def process_all(self):
         """Process all character sheets"""
         input_dir = self.config["input_dir"]
         
-        # Get all image files
+        # Get all image files in a single directory scan (extension match is case-insensitive)
         image_files = []
-        for ext in ['*.png', '*.jpg', '*.jpeg', '*.PNG', '*.JPG', '*.JPEG']:
-            image_files.extend(Path(input_dir).glob(ext))
+        if os.path.isdir(input_dir):
+            with os.scandir(input_dir) as entries:
+                image_files = sorted(Path(e.path) for e in entries
+                                     if e.is_file() and e.name.rsplit('.', 1)[-1].lower() in {'png', 'jpg', 'jpeg'})
         
         if not image_files:
             print(f"No image files found in {input_dir}")
@@ -424,16 +501,30 @@ class ImprovedVisualExtractor:
         
         total_sprites = 0
         
-        for image_path in image_files:
-            character_name = image_path.stem
-            sprite_count = self.extract_sprites_improved(str(image_path), character_name)
-            total_sprites += sprite_count
-            print(f"Successfully extracted {sprite_count} sprites from {character_name}")
-            print("-" * 60)
+        # Sheets are independent, so extract them in parallel and merge the results here
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_worker) as executor:
+            results = executor.map(_extract_one, repeat(self.config), repeat(self.current_pattern),
+                                   [str(p) for p in image_files])
+            for character_name, manifest_fragment, sprite_count in results:
+                if manifest_fragment is not None:
+                    self.asset_manifest["assets"][character_name] = manifest_fragment
+                total_sprites += sprite_count
+                print(f"Successfully extracted {sprite_count} sprites from {character_name}")
+                print("-" * 60)
         
         self.save_asset_manifest()
         print(f"\n✅ Asset processing complete! Total sprites extracted: {total_sprites}")
 
+def _init_worker():
+    """Worker initializer: one OpenCV thread per process, since the pool already uses every core"""
+    cv2.setNumThreads(1)
+
+def _extract_one(config: dict, pattern_name: str, image_path: str) -> tuple:
+    """Worker entrypoint: extract one sheet with a fresh extractor"""
+    extractor = ImprovedVisualExtractor(config=config)
+    extractor.current_pattern = pattern_name
+    return extractor.extract_sheet(image_path, Path(image_path).stem)
+
 def main():
     parser = argparse.ArgumentParser(description="Improved Visual Sprite Extractor")
     parser.add_argument('--config', default='asset_config.json', help='Config file path')
@@ -441,6 +532,8 @@ def main():
     
     args = parser.parse_args()
     
+    print(f"Using Pillow {PIL.__version__}")
+    
     start_time = time.time()
     extractor = ImprovedVisualExtractor(args.config)
     
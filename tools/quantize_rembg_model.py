@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+rembg Model Quantizer
+Converts the U2-Net background removal model to int8 ONNX for faster CPU inference
+"""
+
+import os
+import argparse
+from pathlib import Path
+import numpy as np
+from PIL import Image
+import onnxruntime
+from onnxruntime.quantization import CalibrationDataReader, QuantType, quantize_static
+
+# Input preprocessing used by rembg's U2-Net sessions
+INPUT_SIZE = (320, 320)
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
+
+class SpriteCalibrationReader(CalibrationDataReader):
+    """Feeds representative sprites to the quantizer for activation ranges"""
+
+    def __init__(self, image_paths, input_name: str):
+        self.input_name = input_name
+        self.image_paths = iter(image_paths)
+
+    def preprocess(self, image_path: str) -> np.ndarray:
+        """Resize and normalize a sprite the same way rembg does"""
+        img = Image.open(image_path).convert("RGB").resize(INPUT_SIZE, Image.LANCZOS)
+        data = np.array(img, dtype=np.float32)
+        data = data / max(float(data.max()), 1e-6)
+        data = (data - np.array(MEAN, dtype=np.float32)) / np.array(STD, dtype=np.float32)
+        return data.transpose((2, 0, 1))[np.newaxis].astype(np.float32)
+
+    def get_next(self):
+        image_path = next(self.image_paths, None)
+        if image_path is None:
+            return None
+        return {self.input_name: self.preprocess(image_path)}
+
+def main():
+    default_model = os.path.join(Path.home(), ".u2net", "u2netp.onnx")
+    parser = argparse.ArgumentParser(description="Quantize the rembg U2-Net model to int8")
+    parser.add_argument('--model', default=default_model, help='FP32 ONNX model to quantize')
+    parser.add_argument('--output', default=os.path.join(Path.home(), ".u2net", "u2netp_int8.onnx"),
+                        help='Where to write the int8 model')
+    parser.add_argument('--calibration-dir', default='assets/game/characters',
+                        help='Directory of sprites used for calibration')
+    parser.add_argument('--limit', type=int, default=64, help='Maximum number of calibration sprites')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Error: Model not found: {args.model}")
+        print("Run the asset processor once with rembg enabled to download it.")
+        return
+
+    image_paths = sorted(str(p) for p in Path(args.calibration_dir).rglob("*.png"))[:args.limit]
+    if not image_paths:
+        print(f"No calibration sprites found in {args.calibration_dir}")
+        return
+
+    # Exported rembg models don't agree on the input tensor's name, so ask the model
+    input_name = onnxruntime.InferenceSession(args.model, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    print(f"Quantizing {args.model} with {len(image_paths)} calibration sprites...")
+    quantize_static(
+        args.model,
+        args.output,
+        SpriteCalibrationReader(image_paths, input_name),
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+        op_types_to_quantize=["Conv"],
+    )
+    print(f"Int8 model saved to: {args.output}")
+    print('Set "rembg_model_path" under "background_removal" in your config to use it.')
+
+if __name__ == "__main__":
+    main()
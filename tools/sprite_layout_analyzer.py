@@ -6,14 +6,27 @@ Helps identify what sprites are in each grid position
 
 import os
 from PIL import Image
+import numpy as np
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-def analyze_sprite_layout(image_path: str):
-    """Analyze and display the sprite layout"""
+def grid_tiles(image: Image.Image, rows: int, cols: int) -> np.ndarray:
+    """Split an image into a (rows, cols, tile_h, tile_w[, channels]) array of grid cells.
+    The pixels are copied out of PIL (and again if the sheet doesn't divide evenly into the grid);
+    every cell is then a view into that one array"""
+    data = np.asarray(image)
+    tile_h, tile_w = data.shape[0] // rows, data.shape[1] // cols
+    data = np.ascontiguousarray(data[:rows * tile_h, :cols * tile_w])
+    return data.reshape(rows, tile_h, cols, tile_w, *data.shape[2:]).swapaxes(1, 2)
+
+def analyze_sprite_layout(image_path: str, save_originals: bool = False):
+    """Analyze and display the sprite layout, optionally saving every cell at its original size"""
     
-    # Load image
+    # Load image (palette images are expanded so the cells can be sliced as arrays)
     image = Image.open(image_path)
+    if image.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+        image = image.convert('RGBA')
     character_name = os.path.splitext(os.path.basename(image_path))[0]
     
     # Assume 4x4 grid (adjust if needed)
@@ -34,32 +47,42 @@ def analyze_sprite_layout(image_path: str):
     debug_dir = f"debug_sprites_{character_name}"
     os.makedirs(debug_dir, exist_ok=True)
     
-    # Create a preview showing each sprite position
-    for row in range(rows):
-        print(f"│  {row}  │", end="")
-        for col in range(cols):
-            x = col * sprite_width
-            y = row * sprite_height
-            
-            # Extract sprite
-            sprite = image.crop((x, y, x + sprite_width, y + sprite_height))
-            
-            # Save larger preview for better examination
-            preview_path = os.path.join(debug_dir, f"sprite_r{row}_c{col}.png")
-            sprite_resized = sprite.resize((128, 128), Image.LANCZOS)  # Bigger for better viewing
-            sprite_resized.save(preview_path)
-            
-            # Also save original size
-            original_path = os.path.join(debug_dir, f"original_r{row}_c{col}.png")
-            sprite.save(original_path)
-            
-            print(f" R{row}C{col} │", end="")
-        print()
+    # Every cell is scaled by the same ratio, so resize the whole grid once
+    # instead of resizing each cell separately
+    preview_size = 128  # Bigger for better viewing
+    grid = image.crop((0, 0, cols * sprite_width, rows * sprite_height))
+    previews = grid.resize((cols * preview_size, rows * preview_size), Image.BILINEAR)  # Plenty for eyeballing
+    
+    # The resized grid already is a mosaic of every cell, so save it in one encode
+    mosaic_path = os.path.join(debug_dir, "mosaic.png")
+    previews.save(mosaic_path)
+    
+    # Original-size cells as views into one array of the sheet, only converted back to images when saved
+    original_tiles = grid_tiles(grid, rows, cols) if save_originals else None
+    
+    # PNG encoding releases the GIL, so the original-size writes run on a small thread pool
+    with ThreadPoolExecutor(max_workers=4) as io_pool:
+        save_futures = []
+        for row in range(rows):
+            print(f"│  {row}  │", end="")
+            for col in range(cols):
+                if save_originals:
+                    original_path = os.path.join(debug_dir, f"original_r{row}_c{col}.png")
+                    save_futures.append(io_pool.submit(
+                        Image.fromarray(original_tiles[row, col], image.mode).save, original_path))
+                
+                print(f" R{row}C{col} │", end="")
+            print()
+        
+        # Surface any save errors
+        for future in save_futures:
+            future.result()
     
     print("└─────┴─────┴─────┴─────┴─────┘")
     print(f"\nPreview images saved in: {debug_dir}/")
-    print("- sprite_r#_c#.png (128x128 for easy viewing)")
-    print("- original_r#_c#.png (original extracted size)")
+    print(f"- mosaic.png (every cell at {preview_size}x{preview_size}, laid out as in the sheet)")
+    if save_originals:
+        print("- original_r#_c#.png (original extracted size)")
     
     # Common patterns to check
     print("\n" + "="*50)
@@ -88,7 +111,7 @@ def analyze_sprite_layout(image_path: str):
     print("\n" + "="*50)
     print("INSTRUCTIONS:")
     print("="*50)
-    print(f"1. Look at the images in '{debug_dir}/'")
+    print(f"1. Look at '{debug_dir}/mosaic.png' (cell R#C# is row #, column #)")
     print("2. Identify the pattern your sprite sheet follows")
     print("3. Note which direction each character faces in each position")
     print("4. Note what action/animation frame each position represents")
@@ -185,10 +208,14 @@ def create_naming_config(pattern_type: str, character_name: str):
     return config
 
 def main():
-    if len(sys.argv) < 2:
+    # Optional flag: also write every cell at its original size
+    args = [arg for arg in sys.argv[1:] if arg != "--originals"]
+    save_originals = len(args) != len(sys.argv) - 1
+    
+    if len(args) < 1:
         print("Usage:")
-        print("  python sprite_layout_analyzer.py <sprite_sheet.png>")
-        print("  python sprite_layout_analyzer.py <sprite_sheet.png> <pattern_type>")
+        print("  python sprite_layout_analyzer.py <sprite_sheet.png> [--originals]")
+        print("  python sprite_layout_analyzer.py <sprite_sheet.png> <pattern_type> [--originals]")
         print("\nPattern types:")
         print("  - direction_by_row (most common)")
         print("  - direction_by_row_rpg (RPG style)")
@@ -196,18 +223,18 @@ def main():
         print("  - action_by_row (actions in rows)")
         sys.exit(1)
     
-    image_path = sys.argv[1]
+    image_path = args[0]
     
     if not os.path.exists(image_path):
         print(f"Error: Image file not found: {image_path}")
         sys.exit(1)
     
     # Analyze the sprite layout
-    debug_dir = analyze_sprite_layout(image_path)
+    debug_dir = analyze_sprite_layout(image_path, save_originals)
     
     # If pattern type provided, generate naming config
-    if len(sys.argv) > 2:
-        pattern_type = sys.argv[2]
+    if len(args) > 1:
+        pattern_type = args[1]
         character_name = os.path.splitext(os.path.basename(image_path))[0]
         config = create_naming_config(pattern_type, character_name)
         
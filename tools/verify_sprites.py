@@ -4,6 +4,7 @@ Quick sprite verification tool
 """
 
 from PIL import Image
+import numpy as np
 import os
 
 def check_sprite_quality(sprite_path: str):
@@ -21,11 +22,9 @@ def check_sprite_quality(sprite_path: str):
         # Check if it has transparency
         if img.mode == 'RGBA':
             # Count transparent pixels
-            import numpy as np
-            data = np.array(img)
-            transparent_pixels = np.sum(data[:, :, 3] == 0)
-            total_pixels = img.size[0] * img.size[1]
-            transparency_ratio = transparent_pixels / total_pixels
+            alpha = np.asarray(img.getchannel('A'))
+            transparent_pixels = np.count_nonzero(alpha == 0)
+            transparency_ratio = transparent_pixels / alpha.size
             
             print(f"   Transparency: {transparency_ratio*100:.1f}% transparent pixels")
             
@@ -40,24 +39,28 @@ def check_sprite_quality(sprite_path: str):
         print(f"❌ Error loading sprite: {e}")
         return False
 
-# Test a few sprites
-sprites_to_check = [
-    "assets/game/characters/Dixon_Water/Dixon_Water_idle_down.png",
-    "assets/game/characters/Dixon_Water/Dixon_Water_walk_right.png", 
-    "assets/game/characters/Dixon_Floral/Dixon_Floral_idle_down.png",
-    "assets/game/characters/Dixon_Floral/Dixon_Floral_jump_up.png"
-]
+def main():
+    # Test a few sprites
+    sprites_to_check = [
+        "assets/game/characters/Dixon_Water/Dixon_Water_idle_down.png",
+        "assets/game/characters/Dixon_Water/Dixon_Water_walk_right.png", 
+        "assets/game/characters/Dixon_Floral/Dixon_Floral_idle_down.png",
+        "assets/game/characters/Dixon_Floral/Dixon_Floral_jump_up.png"
+    ]
 
-print("🔍 Checking sprite extraction quality...\n")
+    print("🔍 Checking sprite extraction quality...\n")
 
-for sprite_path in sprites_to_check:
-    check_sprite_quality(sprite_path)
-    print()
+    for sprite_path in sprites_to_check:
+        check_sprite_quality(sprite_path)
+        print()
 
-print("🎮 Sprite extraction verification complete!")
-print("💡 You can now test the game at http://localhost:3000")
-print("🎯 Look for:")
-print("   • Complete character sprites (not cropped)")
-print("   • Transparent backgrounds") 
-print("   • Smooth idle breathing animation")
-print("   • Clean UI without debug text")
+    print("🎮 Sprite extraction verification complete!")
+    print("💡 You can now test the game at http://localhost:3000")
+    print("🎯 Look for:")
+    print("   • Complete character sprites (not cropped)")
+    print("   • Transparent backgrounds") 
+    print("   • Smooth idle breathing animation")
+    print("   • Clean UI without debug text")
+
+if __name__ == "__main__":
+    main()